@@ -1,4 +1,5 @@
-from typing import Tuple, Optional, Union, Callable
+from typing import Tuple, Optional, Union, Callable, Set
+import inspect
 import pickle
 from time import time
 
@@ -9,9 +10,12 @@ import torch
 
 from ikflow import config
 from ikflow.config import DEFAULT_TORCH_DTYPE
-from ikflow.model import IkflowModelParameters, glow_cNF_model
+from ikflow.supporting_types import IkflowModelParameters
+from ikflow.model import glow_cNF_model
 from ikflow.evaluation_utils import evaluate_solutions, SOLUTION_EVALUATION_RESULT_TYPE
 
+_LOAD_STATE_DICT_SUPPORTS_ASSIGN = "assign" in inspect.signature(torch.nn.Module.load_state_dict).parameters
+
 
 def draw_latent(
     latent_distribution: str,
@@ -37,11 +41,6 @@ class IKFlowSolver:
         ), f"Error - hyper_parameters should be IkflowModelParameters type, is {type(hyper_parameters)}"
         assert isinstance(robot, Robot), f"Error - robot should be Robot type, is {type(robot)}"
 
-        # Add 'sigmoid_on_output' if IkflowModelParameters instance doesn't have it. This will be the case when loading
-        # from training runs from before this parameter was added
-        if not hasattr(hyper_parameters, "sigmoid_on_output"):
-            hyper_parameters.sigmoid_on_output = False
-
         if hyper_parameters.softflow_enabled:
             assert (
                 not hyper_parameters.sigmoid_on_output
@@ -55,6 +54,9 @@ class IKFlowSolver:
         # Note: Changing `nn_model` to `_nn_model` may break the logic in 'download_model_from_wandb_checkpoint.py'
         self.nn_model = glow_cNF_model(hyper_parameters, self._robot, self.dim_cond, self._network_width)
         self.ndof = self.robot.ndof
+        self._dtype = torch.get_default_dtype()
+        # Names of the weights that weren't loaded by `load_state_dict()` when it was called with `keep_prefixes`
+        self._unloaded_weights: Tuple[str, ...] = ()
 
     @property
     def robot(self) -> Robot:
@@ -64,6 +66,11 @@ class IKFlowSolver:
     def network_width(self) -> int:
         return self._network_width
 
+    @property
+    def dtype(self) -> torch.dtype:
+        """The dtype of the network's floating point weights"""
+        return self._dtype
+
     @property
     def conditional_size(self) -> int:
         """Dimensionality of the conditional vector. Without softflow it's 7: [x, y, z, q0, q1, q2, q3]. With softflow
@@ -90,11 +97,19 @@ class IKFlowSolver:
     ):
         """Run the network."""
         assert latent.shape[0] == conditional.shape[0], f"{len(latent)} != {len(conditional)}"
+        if len(self._unloaded_weights) > 0:
+            raise RuntimeError(
+                f"The network was only partially loaded ({len(self._unloaded_weights)} weights weren't loaded, e.g."
+                f" '{self._unloaded_weights[0]}'), unable to run inference"
+            )
 
         # Run model, format and return output
         t0 = time()
-        output_rev, _ = self.nn_model(latent, c=conditional, rev=True)
-        solutions = output_rev[:, 0 : self.ndof]
+        # The network may have been loaded in reduced precision (see `load_state_dict()`), the solutions are always
+        # returned as DEFAULT_TORCH_DTYPE
+        dtype = self.dtype
+        output_rev, _ = self.nn_model(latent.to(dtype), c=conditional.to(dtype), rev=True)
+        solutions = output_rev[:, 0 : self.ndof].to(DEFAULT_TORCH_DTYPE)
 
         if clamp_to_joint_limits:
             solutions = self.robot.clamp_to_joint_limits(solutions)
@@ -409,11 +424,71 @@ class IKFlowSolver:
             printc(make_text_green_or_red(f"Missing target poses not found, returning ({time() - t0} sec)", False))
             return solutions, valids
 
-    def load_state_dict(self, state_dict_filename: str):
-        """Set the nn_models state_dict"""
+    def load_state_dict(
+        self,
+        state_dict_filename: str,
+        dtype: Optional[torch.dtype] = None,
+        keep_prefixes: Optional[Tuple[str, ...]] = None,
+    ):
+        """Set the nn_models state_dict. When supported (torch>=2.1), the unpickled tensors are assigned to the network
+        directly rather than being copied into its existing parameters
+
+        Args:
+            state_dict_filename (str): Path to the pickled state_dict
+            dtype (Optional[torch.dtype]): The dtype to convert the network's floating point weights to, for example
+                                            torch.float16 or torch.bfloat16 for faster inference. Defaults to
+                                            `self.dtype`. Loaded weights are converted before they're moved to the device
+            keep_prefixes (Optional[Tuple[str, ...]]): If set, only the weights whose names start with one of these
+                                            prefixes are loaded. The remaining weights are freed (moved to the 'meta'
+                                            device), and the solver can't be used for inference
+        """
         with open(state_dict_filename, "rb") as f:
             try:
-                self.nn_model.load_state_dict(pickle.load(f))
+                state_dict = pickle.load(f)
             except pickle.UnpicklingError as e:
                 print(f"Error loading state dict from {state_dict_filename}: {e}")
                 raise e
+
+        strict = keep_prefixes is None
+        if keep_prefixes is not None:
+            state_dict = {k: v for k, v in state_dict.items() if k.startswith(keep_prefixes)}
+
+        if dtype is None:
+            dtype = self._dtype
+        for k, v in state_dict.items():
+            # Convert before moving to the device so that only the converted tensor is copied over
+            if v.is_floating_point():
+                v = v.to(dtype)
+            state_dict[k] = v.to(config.device)
+
+        if _LOAD_STATE_DICT_SUPPORTS_ASSIGN:
+            # `assign=True` doesn't preserve `requires_grad` on all torch versions, so it's restored manually
+            requires_grad = {name: param.requires_grad for name, param in self.nn_model.named_parameters()}
+            self.nn_model.load_state_dict(state_dict, strict=strict, assign=True)
+            for name, param in self.nn_model.named_parameters():
+                param.requires_grad_(requires_grad[name])
+        else:
+            self.nn_model.load_state_dict(state_dict, strict=strict)
+
+        self._unloaded_weights = self._release_weights(set(state_dict.keys()))
+        # Converts the weights that weren't assigned from `state_dict` above, so that all of them end up in `dtype`
+        self.nn_model.to(dtype=dtype)
+        self._dtype = dtype
+
+    def _release_weights(self, keep: Set[str]) -> Tuple[str, ...]:
+        """Move the network's parameters and buffers whose names aren't in `keep` to the 'meta' device, freeing their
+        memory. Returns the names of the released weights
+        """
+        released = []
+        for name, tensor in self.nn_model.state_dict(keep_vars=True).items():
+            if name in keep:
+                continue
+            module_name, _, tensor_name = name.rpartition(".")
+            module = self.nn_model.get_submodule(module_name)
+            meta_tensor = torch.empty_like(tensor, device="meta")
+            if tensor_name in module._parameters:
+                module._parameters[tensor_name] = torch.nn.Parameter(meta_tensor, requires_grad=tensor.requires_grad)
+            else:
+                module._buffers[tensor_name] = meta_tensor
+            released.append(name)
+        return tuple(released)
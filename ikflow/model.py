@@ -9,38 +9,12 @@ import torch
 
 from ikflow import config
 from ikflow.config import SIGMOID_SCALING_ABS_MAX
+from ikflow.supporting_types import IkflowModelParameters
 from ikflow.utils import assert_joint_angle_tensor_in_joint_limits
 
 _VERBOSE = False
 
 
-class IkflowModelParameters:
-    def __init__(self):
-        self.coupling_layer = "glow"
-        self.nb_nodes = 12
-        self.dim_latent_space = 9
-        self.coeff_fn_config = 3
-        self.coeff_fn_internal_size = 1024
-        self.permute_random_enabled = True
-        self.sigmoid_on_output = False
-
-        # ___ Loss parameters
-        self.lambd_predict = 1.0  # Fit Loss lambda
-        self.init_scale = 0.04473500291638653
-        self.rnvp_clamp = 2.5
-        self.y_noise_scale = 1e-7  # Add some noise to the cartesian poses
-        self.zeros_noise_scale = 1e-3  # Also add noise to the padding
-
-        self.softflow_noise_scale = 0.01
-        self.softflow_enabled = True
-
-    def __str__(self) -> str:
-        s = "IkflowModelParameters\n"
-        for k, v in self.__dict__.items():
-            s += f"  {k}: \t{v}\n"
-        return s
-
-
 # Convenience variable for testing purposes
 TINY_MODEL_PARAMS = IkflowModelParameters()
 TINY_MODEL_PARAMS.nb_nodes = 3
@@ -1,17 +1,60 @@
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Dict, List, BinaryIO
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import hashlib
+import pkgutil
+import re
+import threading
 import yaml
 import os
-from urllib.request import urlretrieve
+from http.client import HTTPConnection, HTTPSConnection, HTTPException, HTTPResponse
+from urllib.parse import urlsplit, urljoin
+from urllib.request import Request, urlopen, getproxies
+from urllib.error import HTTPError
+
+from tqdm import tqdm
+import torch
 
 from jrl.robot import Robot
 from jrl.robots import get_robot
-from ikflow.utils import safe_mkdir, get_filepath
+from ikflow.utils import safe_mkdir, skip_parameter_initialization
 from ikflow.ikflow_solver import IKFlowSolver
-from ikflow.model import IkflowModelParameters
+from ikflow.supporting_types import IkflowModelParameters
+from ikflow import config
 from ikflow.config import MODELS_DIR
 
-with open(get_filepath("model_descriptions.yaml"), "r") as f:
-    MODEL_DESCRIPTIONS = yaml.safe_load(f)
+_DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+_DOWNLOAD_TIMEOUT = 60  # seconds, for connecting and for each read
+_MAX_REDIRECTS = 10  # same limit as urllib's HTTPRedirectHandler
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Open http(s) connections, per thread and keyed by (scheme, host). Reusing them means repeated downloads from the same
+# host only pay for the TCP and TLS handshakes once
+_CONNECTIONS = threading.local()
+
+# Fields of a model description in 'model_descriptions.yaml' that aren't model hyperparameters
+_NON_HYPERPARAMETER_KEYS = ("robot_name", "model_weights_url", "sha256")
+
+# Use the libyaml backed loader when it's available - it's significantly faster than the pure python implementation
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+
+@lru_cache(maxsize=1)
+def _model_descriptions() -> Dict[str, Dict]:
+    """Return the parsed contents of `model_descriptions.yaml`. The file is read on the first call rather than at
+    import time. It's read through the package's loader, so this also works when ikflow is imported from a zip archive
+    """
+    return yaml.load(pkgutil.get_data("ikflow", "model_descriptions.yaml"), Loader=_YamlLoader)
+
+
+def __getattr__(name: str):
+    # `MODEL_DESCRIPTIONS` used to be parsed at import time. It's kept importable, but is now loaded on first access
+    if name == "MODEL_DESCRIPTIONS":
+        return _model_descriptions()
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 
 def _assert_model_downloaded_correctly(filepath: str):
@@ -23,17 +66,190 @@ def _assert_model_downloaded_correctly(filepath: str):
     )
 
 
+def _sha256(filepath: str) -> str:
+    """Return the hex encoded sha256 digest of the file at `filepath`"""
+    with open(filepath, "rb") as f:
+        # hashlib.file_digest() was added in python 3.11
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        digest = hashlib.sha256()
+        _update_sha256(digest, f)
+        return digest.hexdigest()
+
+
+def _update_sha256(digest, f: BinaryIO):
+    """Update the sha256 `digest` with the remaining contents of the open file `f`"""
+    for chunk in iter(lambda: f.read(_DOWNLOAD_CHUNK_SIZE), b""):
+        digest.update(chunk)
+
+
+def _checksum_matches(filepath: str, sha256: Optional[str]) -> bool:
+    """Return whether the file at `filepath` matches the expected sha256 digest. The digest defaults to the one saved
+    in the '<filepath>.sha256' sidecar file when the model was downloaded. Returns True if no digest is available.
+    """
+    sidecar_filepath = filepath + ".sha256"
+    if sha256 is None and os.path.isfile(sidecar_filepath):
+        with open(sidecar_filepath, "r") as f:
+            sha256 = f.read().strip()
+    if sha256 is None:
+        return True
+    return _sha256(filepath) == sha256.lower()
+
+
+def _open_url(url: str, headers: Dict[str, str], redirects_remaining: int = _MAX_REDIRECTS) -> HTTPResponse:
+    """Send a GET request for `url` over this thread's persistent connection to the host, and return the response.
+    Falls back to `urlopen()` for non http(s) urls, or when a proxy is configured. Raises an `HTTPError` for error
+    responses, other 3xx responses that can't be followed, and for more than `_MAX_REDIRECTS` redirects, like
+    `urlopen()` does. The url the response was finally
+    served from is stored in `response.url`, as with `urlopen()`.
+    """
+    parsed = urlsplit(url)
+    if parsed.scheme not in ("http", "https") or getproxies():
+        return urlopen(Request(url, headers=headers), timeout=_DOWNLOAD_TIMEOUT)
+
+    connections = _CONNECTIONS.__dict__.setdefault("connections", {})
+    key = (parsed.scheme, parsed.netloc)
+    path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+    for is_retry in (False, True):
+        if key not in connections:
+            connection_type = HTTPSConnection if parsed.scheme == "https" else HTTPConnection
+            connections[key] = connection_type(parsed.netloc, timeout=_DOWNLOAD_TIMEOUT)
+        connection = connections[key]
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            break
+        except (ConnectionError, HTTPException) as e:
+            # The server may have closed an idle connection - reconnect and try once more
+            connection.close()
+            del connections[key]
+            if is_retry:
+                raise e
+
+    if response.status in _REDIRECT_STATUSES and "Location" in response.headers:
+        response.read()
+        if redirects_remaining == 0:
+            raise HTTPError(url, response.status, "Too many redirects", response.headers, None)
+        return _open_url(urljoin(url, response.headers["Location"]), headers, redirects_remaining - 1)
+    if response.status >= 300:
+        response.read()
+        raise HTTPError(url, response.status, response.reason, response.headers, None)
+    response.url = url
+    return response
+
+
+def _close_connection(url: str):
+    """Close this thread's persistent connection to the host of `url`, if there is one. Use this to abandon a response
+    without reading the rest of its body
+    """
+    parsed = urlsplit(url)
+    connection = _CONNECTIONS.__dict__.get("connections", {}).pop((parsed.scheme, parsed.netloc), None)
+    if connection is not None:
+        connection.close()
+
+
+def _content_range_start(response: HTTPResponse) -> Optional[int]:
+    """Return the first byte offset of a 206 (Partial Content) response, from its 'Content-Range' header"""
+    match = re.match(r"bytes (\d+)-", response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match is not None else None
+
+
+def _remove_part_file(part_filepath: str):
+    for filepath in (part_filepath, part_filepath + ".etag"):
+        if os.path.isfile(filepath):
+            os.remove(filepath)
+
+
+def _download_file(url: str, save_filepath: str) -> str:
+    """Download the file at `url` to `save_filepath`. Data is streamed in chunks to '<save_filepath>.part', which is
+    renamed to `save_filepath` once the download completes. If a '.part' file from an interrupted download exists, the
+    download is resumed from where it left off using an HTTP Range request. The ETag of the remote file is saved to
+    '<save_filepath>.part.etag' when a download starts, and resuming only happens if the remote file still has that
+    ETag (checked by the server via 'If-Range').
+
+    Returns the hex encoded sha256 digest of the downloaded file. It's computed as the data is streamed in, so the file
+    doesn't need to be read back from disk afterwards.
+    """
+    part_filepath = save_filepath + ".part"
+    etag_filepath = part_filepath + ".etag"
+    offset = os.path.getsize(part_filepath) if os.path.isfile(part_filepath) else 0
+    headers = {}
+    if offset > 0:
+        headers["Range"] = f"bytes={offset}-"
+        if os.path.isfile(etag_filepath):
+            with open(etag_filepath, "r") as f:
+                headers["If-Range"] = f.read()
+    try:
+        response = _open_url(url, headers)
+    except HTTPError as e:
+        # 416 (Range Not Satisfiable) means the '.part' file doesn't match the remote file - start over
+        if e.code != 416:
+            raise e
+        _remove_part_file(part_filepath)
+        return _download_file(url, save_filepath)
+
+    with response:
+        if response.getcode() != 206:
+            # The server ignored the Range header, or the remote file changed since the '.part' file was started (per
+            # 'If-Range'), and is sending the whole file
+            offset = 0
+        elif _content_range_start(response) != offset:
+            # The server is sending a different part of the file than was asked for - start over
+            _close_connection(response.url)
+            _remove_part_file(part_filepath)
+            return _download_file(url, save_filepath)
+        if offset == 0:
+            _remove_part_file(part_filepath)
+            etag = response.headers.get("ETag")
+            # Weak ETags can't be used with If-Range
+            if etag is not None and not etag.startswith("W/"):
+                with open(etag_filepath, "w") as f:
+                    f.write(etag)
+        digest = hashlib.sha256()
+        if offset > 0:
+            with open(part_filepath, "rb") as f:
+                _update_sha256(digest, f)
+        content_length = response.headers.get("Content-Length")
+        total = offset + int(content_length) if content_length is not None else None
+        with open(part_filepath, "ab" if offset > 0 else "wb") as f, tqdm(
+            total=total, initial=offset, unit="B", unit_scale=True, unit_divisor=1024, desc=os.path.basename(url)
+        ) as progress_bar:
+            while True:
+                chunk = response.read(_DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                digest.update(chunk)
+                progress_bar.update(len(chunk))
+    os.replace(part_filepath, save_filepath)
+    if os.path.isfile(etag_filepath):
+        os.remove(etag_filepath)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _get_robot(robot_name: str) -> Robot:
+    """Memoized `get_robot()`, so the robot's urdf is only parsed once when building several solvers for it. Robots
+    aren't modified after construction, so sharing them between solvers is safe
+    """
+    return get_robot(robot_name)
+
+
 def get_all_model_names() -> Tuple[str]:
     """Return a tuple of the model names"""
-    return tuple(MODEL_DESCRIPTIONS.keys())
+    return tuple(_model_descriptions().keys())
 
 
-def download_model(url: str, download_dir: Optional[str] = None) -> str:
+def download_model(url: str, download_dir: Optional[str] = None, sha256: Optional[str] = None) -> str:
     """Download the model at the url `url` to the given directory. download_dir defaults to MODELS_DIR
 
+    A previously downloaded model is only reused if its sha256 digest matches `sha256` (or, if `sha256` isn't given,
+    the digest recorded when it was downloaded). Otherwise it's deleted and downloaded again.
+
     Args:
         model_url (str): _description_
         download_dir (str): _description_
+        sha256 (Optional[str]): The expected hex encoded sha256 digest of the model file
     """
     if download_dir is None:
         download_dir = MODELS_DIR
@@ -42,13 +258,39 @@ def download_model(url: str, download_dir: Optional[str] = None) -> str:
     model_name = model_filename(url)
     save_filepath = os.path.join(download_dir, model_name)
     if os.path.isfile(save_filepath):
-        _assert_model_downloaded_correctly(save_filepath)
-        return save_filepath
-    urlretrieve(url, filename=save_filepath)  # returns (filename, headers)
+        if _checksum_matches(save_filepath, sha256):
+            _assert_model_downloaded_correctly(save_filepath)
+            return save_filepath
+        print(f"Model weights saved at '{save_filepath}' failed checksum verification, downloading again")
+        os.remove(save_filepath)
+    digest = _download_file(url, save_filepath)
     _assert_model_downloaded_correctly(save_filepath)
+    assert (
+        sha256 is None or digest == sha256.lower()
+    ), f"Downloaded model weights at '{save_filepath}' have sha256 digest {digest}, expected {sha256}"
+    with open(save_filepath + ".sha256", "w") as f:
+        f.write(digest)
     return save_filepath
 
 
+def download_models(urls: List[str], download_dir: Optional[str] = None, max_workers: int = 8) -> List[str]:
+    """Download the models at the urls `urls` to the given directory in parallel. Returns the filepaths of the
+    downloaded models, in the same order as `urls`. Models listed in `model_descriptions.yaml` are verified against
+    their 'sha256' field, if it's set. See `download_model()`
+    """
+    sha256s = {
+        description["model_weights_url"]: description.get("sha256") for description in _model_descriptions().values()
+    }
+    # Duplicate urls would otherwise be downloaded concurrently into the same '.part' file
+    unique_urls = list(dict.fromkeys(urls))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        filepaths = executor.map(
+            lambda url: download_model(url, download_dir=download_dir, sha256=sha256s.get(url)), unique_urls
+        )
+        filepaths = dict(zip(unique_urls, filepaths))
+    return [filepaths[url] for url in urls]
+
+
 def model_filename(url: str) -> str:
     """Return the model alias given the url of the model (stored in google cloud presumably).
 
@@ -57,34 +299,60 @@ def model_filename(url: str) -> str:
     return url.split("/")[-1]
 
 
-def get_ik_solver(model_name: str, robot: Optional[Robot] = None) -> Tuple[IKFlowSolver, IkflowModelParameters]:
+@lru_cache(maxsize=8)
+def get_ik_solver(
+    model_name: str,
+    robot: Optional[Robot] = None,
+    dtype: Optional[torch.dtype] = None,
+    keep_prefixes: Optional[Tuple[str, ...]] = None,
+) -> Tuple[IKFlowSolver, IkflowModelParameters]:
     """Build and return the `IKFlowSolver` for the given model. The input `model_name` should match and index in `model_descriptions.yaml`
 
+    Results are memoized on the arguments, so repeated calls return the same `IKFlowSolver` instance. Call
+    `get_ik_solver.cache_clear()` to release the cached solvers.
+
+    Args:
+        model_name (str): The name of the model in `model_descriptions.yaml`
+        robot (Optional[Robot]): The robot the model was trained for. Built from the model description if not given
+        dtype (Optional[torch.dtype]): The dtype of the networks floating point weights, for example torch.float16 or
+                                        torch.bfloat16 for faster inference. Defaults to torch's default dtype
+        keep_prefixes (Optional[Tuple[str, ...]]): If set, only the weights whose names start with one of these
+                                        prefixes are loaded. The remaining weights are freed, and the returned solver
+                                        can't be used for inference. See `IKFlowSolver.load_state_dict()`
+
     Returns:
         Tuple[IKFlowSolver, IkflowModelParameters]: A `IKFlowSolver` solver and the corresponding
                                                             `IkflowModelParameters` parameters object
     """
-    assert model_name in MODEL_DESCRIPTIONS, f"Model name '{model_name}' not found in model descriptions"
-    model_weights_url = MODEL_DESCRIPTIONS[model_name]["model_weights_url"]
-    robot_name = MODEL_DESCRIPTIONS[model_name]["robot_name"]
-    hparams = MODEL_DESCRIPTIONS[model_name]
+    model_descriptions = _model_descriptions()
+    assert model_name in model_descriptions, f"Model name '{model_name}' not found in model descriptions"
+    model_weights_url = model_descriptions[model_name]["model_weights_url"]
+    robot_name = model_descriptions[model_name]["robot_name"]
+    hparams = model_descriptions[model_name]
     assert isinstance(robot_name, str), f"robot_name must be a string, got {type(robot_name)}"
     assert isinstance(hparams, dict), f"model_hyperparameters must be a Dict, got {type(hparams)}"
 
-    model_weights_filepath = download_model(model_weights_url)
+    model_weights_filepath = download_model(model_weights_url, sha256=model_descriptions[model_name].get("sha256"))
     assert os.path.isfile(
         model_weights_filepath
     ), f"File '{model_weights_filepath}' was not found. Unable to load model weights"
 
     if robot is None:
-        robot = get_robot(robot_name)
+        robot = _get_robot(robot_name)
     assert robot.name == robot_name
 
     # Build IKFlowSolver and set weights
     hyper_parameters = IkflowModelParameters()
-    hyper_parameters.__dict__.update(hparams)
-    ik_solver = IKFlowSolver(hyper_parameters, robot)
-    ik_solver.load_state_dict(model_weights_filepath)
+    for k, v in hparams.items():
+        if k in _NON_HYPERPARAMETER_KEYS:
+            continue
+        assert k in IkflowModelParameters.__slots__, f"Unknown hyperparameter '{k}' for model '{model_name}'"
+        setattr(hyper_parameters, k, v)
+    # The randomly initialized weights would be immediately overwritten by `load_state_dict()`, so skip initializing them.
+    # Parameters are allocated on the target device directly instead of being built on the cpu and then copied over
+    with skip_parameter_initialization(), torch.device(config.device):
+        ik_solver = IKFlowSolver(hyper_parameters, robot)
+    ik_solver.load_state_dict(model_weights_filepath, dtype=dtype, keep_prefixes=keep_prefixes)
     return ik_solver, hyper_parameters
 
 
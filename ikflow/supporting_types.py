@@ -0,0 +1,59 @@
+from typing import Dict
+
+
+class IkflowModelParameters:
+    __slots__ = (
+        "coupling_layer",
+        "nb_nodes",
+        "dim_latent_space",
+        "coeff_fn_config",
+        "coeff_fn_internal_size",
+        "permute_random_enabled",
+        "sigmoid_on_output",
+        "lambd_predict",
+        "init_scale",
+        "rnvp_clamp",
+        "y_noise_scale",
+        "zeros_noise_scale",
+        "softflow_noise_scale",
+        "softflow_enabled",
+        "run_description",
+    )
+
+    def __init__(self):
+        self.coupling_layer = "glow"
+        self.nb_nodes = 12
+        self.dim_latent_space = 9
+        self.coeff_fn_config = 3
+        self.coeff_fn_internal_size = 1024
+        self.permute_random_enabled = True
+        self.sigmoid_on_output = False
+
+        # ___ Loss parameters
+        self.lambd_predict = 1.0  # Fit Loss lambda
+        self.init_scale = 0.04473500291638653
+        self.rnvp_clamp = 2.5
+        self.y_noise_scale = 1e-7  # Add some noise to the cartesian poses
+        self.zeros_noise_scale = 1e-3  # Also add noise to the padding
+
+        self.softflow_noise_scale = 0.01
+        self.softflow_enabled = True
+
+        self.run_description = None
+
+    def __getstate__(self) -> Dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __setstate__(self, state: Dict):
+        # Instances pickled before `__slots__` was added (i.e. in training checkpoints) may be missing parameters, or
+        # have ones that are no longer used. Start from the defaults and ignore unknown parameters
+        self.__init__()
+        for k, v in state.items():
+            if k in self.__slots__:
+                setattr(self, k, v)
+
+    def __str__(self) -> str:
+        s = "IkflowModelParameters\n"
+        for k, v in self.__getstate__().items():
+            s += f"  {k}: \t{v}\n"
+        return s
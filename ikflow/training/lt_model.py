@@ -11,7 +11,7 @@ from ikflow.training.training_utils import get_softflow_noise
 from ikflow import config
 from ikflow.config import SIGMOID_SCALING_ABS_MAX
 from ikflow.ikflow_solver import IKFlowSolver, draw_latent
-from ikflow.model import IkflowModelParameters
+from ikflow.supporting_types import IkflowModelParameters
 from ikflow.utils import grad_stats
 from ikflow.evaluation_utils import evaluate_solutions
 from ikflow.thirdparty.ranger import RangerVA  # from ranger913A.py
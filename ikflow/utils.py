@@ -1,11 +1,13 @@
 from typing import Tuple, Optional, Callable, List
+from contextlib import contextmanager
 import pathlib
 import os
 import random
-import pkg_resources
+import threading
 
 import numpy as np
 import torch
+import torch.nn as nn
 
 from ikflow import config
 
@@ -46,6 +48,9 @@ def get_dataset_filepaths(dataset_directory: str, tags: List[str]):
 
 
 def get_filepath(local_filepath: str):
+    # pkg_resources is slow to import, so only import it when needed
+    import pkg_resources
+
     return pkg_resources.resource_filename(__name__, local_filepath)
 
 
@@ -53,6 +58,36 @@ def get_filepath(local_filepath: str):
 # Pytorch utils
 
 
+# `skip_parameter_initialization()` replaces `nn.Linear.reset_parameters` once, with a wrapper that only skips the
+# initialization for threads that are inside the context. Layers built by any other thread are initialized as usual
+_SKIP_INIT_LOCK = threading.Lock()
+_skip_init_state = threading.local()
+_linear_reset_parameters = None
+
+
+def _linear_reset_parameters_unless_skipped(self: nn.Linear):
+    if getattr(_skip_init_state, "depth", 0) == 0:
+        _linear_reset_parameters(self)
+
+
+@contextmanager
+def skip_parameter_initialization():
+    """Disable the random initialization of `nn.Linear` parameters constructed by the calling thread within this
+    context. Use this when the parameters of a network are overwritten right after construction, for example when
+    loading a saved state_dict.
+    """
+    global _linear_reset_parameters
+    with _SKIP_INIT_LOCK:
+        if _linear_reset_parameters is None:
+            _linear_reset_parameters = nn.Linear.reset_parameters
+            nn.Linear.reset_parameters = _linear_reset_parameters_unless_skipped
+    _skip_init_state.depth = getattr(_skip_init_state, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _skip_init_state.depth -= 1
+
+
 def assert_joint_angle_tensor_in_joint_limits(
     joints_limits: List[Tuple[float, float]], x: torch.Tensor, description: str, eps: float
 ):
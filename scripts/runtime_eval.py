@@ -1,7 +1,7 @@
 import argparse
 from time import time
 
-from ikflow.model import IkflowModelParameters
+from ikflow.supporting_types import IkflowModelParameters
 from ikflow.ikflow_solver import IKFlowSolver
 from jrl.robots import get_robot
 
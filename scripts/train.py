@@ -1,32 +1,8 @@
 import argparse
 import os
 
-from jrl.robots import get_robot, Robot
-from pytorch_lightning.loggers import WandbLogger
-from pytorch_lightning.callbacks import ModelCheckpoint
-from pytorch_lightning.trainer import Trainer
-
-# sets seeds for numpy, torch, python.random and PYTHONHASHSEED.
-from pytorch_lightning import Trainer, seed_everything
-import wandb
-import torch
-
-from ikflow.config import DATASET_TAG_NON_SELF_COLLIDING
-from jrl.config import GPU_IDX
-
-assert GPU_IDX >= 0
-from ikflow import config
-from ikflow.model import IkflowModelParameters
-from ikflow.ikflow_solver import IKFlowSolver
-from ikflow.training.lt_model import IkfLitModel
-from ikflow.training.lt_data import IkfLitDataset
-from ikflow.training.training_utils import get_checkpoint_dir
-from ikflow.utils import boolean_string, non_private_dict, get_wandb_project
-
-
 DEFAULT_MAX_EPOCHS = 5000
 SEED = 0
-seed_everything(SEED, workers=True)
 
 # Model parameters
 DEFAULT_COUPLING_LAYER = "glow"
@@ -148,20 +124,45 @@ if __name__ == "__main__":
     parser.add_argument("--val_set_size", type=int, default=DEFAULT_VAL_SET_SIZE)
     parser.add_argument("--log_every", type=int, default=DEFAULT_LOG_EVERY)
     parser.add_argument("--checkpoint_every", type=int, default=DEFAULT_CHECKPOINT_EVERY)
-    parser.add_argument("--dataset_tags", nargs="+", type=str, default=[DATASET_TAG_NON_SELF_COLLIDING])
+    parser.add_argument("--dataset_tags", nargs="+", type=str, help="Defaults to ['non-self-colliding']")
     parser.add_argument("--run_description", type=str)
     parser.add_argument("--disable_progress_bar", action="store_true")
     parser.add_argument("--disable_wandb", action="store_true")
 
     args = parser.parse_args()
+
+    # Heavy imports are deferred until after the arguments are parsed, so that '--help' and invalid arguments exit
+    # without waiting on torch, pytorch_lightning and wandb to load
+    from jrl.robots import get_robot
+    from jrl.config import GPU_IDX
+    from pytorch_lightning.loggers import WandbLogger
+    from pytorch_lightning.callbacks import ModelCheckpoint
+
+    # sets seeds for numpy, torch, python.random and PYTHONHASHSEED.
+    from pytorch_lightning import Trainer, seed_everything
+    import wandb
+    import torch
+
+    from ikflow import config
+    from ikflow.config import DATASET_TAG_NON_SELF_COLLIDING
+    from ikflow.supporting_types import IkflowModelParameters
+    from ikflow.ikflow_solver import IKFlowSolver
+    from ikflow.training.lt_model import IkfLitModel
+    from ikflow.training.lt_data import IkfLitDataset
+    from ikflow.training.training_utils import get_checkpoint_dir
+    from ikflow.utils import boolean_string, non_private_dict, get_wandb_project
+
+    assert GPU_IDX >= 0
+    seed_everything(SEED, workers=True)
+
+    if args.dataset_tags is None:
+        args.dataset_tags = [DATASET_TAG_NON_SELF_COLLIDING]
+
     print("\nArgparse arguments:")
     for k, v in vars(args).items():
         print(f"  {k}={v}")
     print()
 
-    if args.dataset_tags is None:
-        args.dataset_tags = []
-
     assert (
         DATASET_TAG_NON_SELF_COLLIDING in args.dataset_tags
     ), "The 'non-self-colliding' dataset should be specified (for now)"
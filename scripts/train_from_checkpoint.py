@@ -7,7 +7,7 @@ from ikflow import config
 from jrl.config import GPU_IDX
 
 assert GPU_IDX >= 0
-from ikflow.model import IkflowModelParameters
+from ikflow.supporting_types import IkflowModelParameters
 from ikflow.ikflow_solver import IKFlowSolver
 from jrl.robots import get_robot
 from ikflow.training.training_utils import get_checkpoint_dir
@@ -1,4 +1,7 @@
 import unittest
+import os
+import pickle
+import tempfile
 from time import time
 
 import torch
@@ -87,6 +90,59 @@ class IkflowSolverTest(unittest.TestCase):
         torch.testing.assert_close(solutions, robot.clamp_to_joint_limits(solutions.clone()))
         assert valid_solutions.sum().item() == n_solutions
 
+    def test_generate_ik_solutions_reduced_precision(self):
+        model_name = "panda__full__lp191_5.25m"
+        ikflow_solver, _ = get_ik_solver(model_name, dtype=torch.float16)
+        self.assertEqual(ikflow_solver.dtype, torch.float16)
+
+        _, target_poses = ikflow_solver.robot.sample_joint_angles_and_poses(
+            100, only_non_self_colliding=True, tqdm_enabled=False
+        )
+        target_poses = torch.tensor(target_poses, device=config.device, dtype=torch.float32)
+        solutions = ikflow_solver.generate_ik_solutions(target_poses, None)
+        self.assertEqual(solutions.dtype, torch.float32)
+        self.assertEqual(solutions.shape, (100, ikflow_solver.robot.ndof))
+
+    def test_load_state_dict_dtype_and_keep_prefixes(self):
+        robot = Panda()
+        state_dict = {k: v.cpu() for k, v in IKFlowSolver(TINY_MODEL_PARAMS, robot).nn_model.state_dict().items()}
+        keep_prefixes = ("module_list.2.",)
+        kept_names = [k for k in state_dict if k.startswith(keep_prefixes)]
+        self.assertGreater(len(kept_names), 0)
+        self.assertLess(len(kept_names), len(state_dict))
+        target_pose = torch.tensor([0.25, 0, 0.5, 1, 0, 0, 0], device=config.device, dtype=torch.float32)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, "model.pkl")
+            with open(filepath, "wb") as f:
+                pickle.dump(state_dict, f)
+
+            # Test 1: full load, converted to float16
+            ikflow_solver = IKFlowSolver(TINY_MODEL_PARAMS, robot)
+            ikflow_solver.load_state_dict(filepath, dtype=torch.float16)
+            self.assertEqual(ikflow_solver.dtype, torch.float16)
+            for name, tensor in ikflow_solver.nn_model.state_dict().items():
+                expected = state_dict[name]
+                if expected.is_floating_point():
+                    expected = expected.to(torch.float16)
+                torch.testing.assert_close(tensor.cpu(), expected)
+            solutions = ikflow_solver.generate_ik_solutions(target_pose, 5)
+            self.assertEqual(solutions.dtype, torch.float32)
+
+            # Test 2: partial load, converted to float16. Unloaded weights are freed and inference is refused
+            ikflow_solver = IKFlowSolver(TINY_MODEL_PARAMS, robot)
+            ikflow_solver.load_state_dict(filepath, dtype=torch.float16, keep_prefixes=keep_prefixes)
+            self.assertEqual(ikflow_solver.dtype, torch.float16)
+            for name, tensor in ikflow_solver.nn_model.state_dict().items():
+                if tensor.is_floating_point():
+                    self.assertEqual(tensor.dtype, torch.float16, msg=name)
+                if name in kept_names:
+                    torch.testing.assert_close(tensor.cpu(), state_dict[name].to(tensor.dtype))
+                else:
+                    self.assertTrue(tensor.is_meta, msg=name)
+            with self.assertRaises(RuntimeError):
+                ikflow_solver.generate_ik_solutions(target_pose, 5)
+
     def test_solve_multiple_poses(self):
 
         robot = Panda()
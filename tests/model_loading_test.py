@@ -1,6 +1,14 @@
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import unittest
+import hashlib
+import os
+import tempfile
+import threading
 
-from ikflow.model_loading import model_filename
+from urllib.error import HTTPError
+
+from ikflow.model_loading import model_filename, get_ik_solver, download_models, _checksum_matches, _download_file
 
 import torch
 
@@ -13,6 +21,221 @@ class ModelLoadingTest(unittest.TestCase):
         filename = model_filename(url)
         self.assertEqual(filename, "atlas_desert-sweep-6.pkl")
 
+    def test_model_descriptions_importable(self):
+        from ikflow.model_loading import MODEL_DESCRIPTIONS, get_all_model_names
+
+        self.assertIsInstance(MODEL_DESCRIPTIONS, dict)
+        self.assertEqual(tuple(MODEL_DESCRIPTIONS.keys()), get_all_model_names())
+
+    def test_checksum_matches(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, "model.pkl")
+            with open(filepath, "wb") as f:
+                f.write(b"ikflow")
+            digest = hashlib.sha256(b"ikflow").hexdigest()
+
+            # No expected digest and no sidecar file
+            self.assertTrue(_checksum_matches(filepath, None))
+            self.assertTrue(_checksum_matches(filepath, digest))
+            self.assertTrue(_checksum_matches(filepath, digest.upper()))
+            self.assertFalse(_checksum_matches(filepath, hashlib.sha256(b"").hexdigest()))
+
+            # Digest read from the sidecar file
+            with open(filepath + ".sha256", "w") as f:
+                f.write(hashlib.sha256(b"ikfl").hexdigest())
+            self.assertFalse(_checksum_matches(filepath, None))
+
+    def test_get_ik_solver_cached(self):
+        model_name = "panda__full__lp191_5.25m"
+        ik_solver, hyper_parameters = get_ik_solver(model_name)
+        ik_solver_2, hyper_parameters_2 = get_ik_solver(model_name)
+        self.assertIs(ik_solver, ik_solver_2)
+        self.assertIs(hyper_parameters, hyper_parameters_2)
+
+        get_ik_solver.cache_clear()
+        ik_solver_3, _ = get_ik_solver(model_name)
+        self.assertIsNot(ik_solver, ik_solver_3)
+
+
+# `download_model()` rejects files smaller than 10 MB
+_MODEL_CONTENTS = os.urandom(11 * 1000 * 1000)
+
+
+class _ModelServerHandler(BaseHTTPRequestHandler):
+    """Serves `_MODEL_CONTENTS` at '/<name>.pkl', supporting Range and If-Range requests. Urls under '/no_range/'
+    ignore the Range header, urls under '/bad_range/' respond to Range requests with the wrong range, urls under
+    '/redirect/' redirect to the root, and '/loop' redirects to itself. '/multiple_choices' and '/not_modified' respond
+    with a 300 and a 304 that don't have a 'Location' header
+    """
+
+    protocol_version = "HTTP/1.1"
+    etag = '"v1"'
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, headers=None, body: bytes = b""):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        self.requests.append((self.path, range_header))
+        if self.path == "/loop":
+            return self._send(302, {"Location": "/loop"})
+        if self.path == "/multiple_choices":
+            return self._send(300, body=b"not a model")
+        if self.path == "/not_modified":
+            return self._send(304)
+        if self.path.startswith("/redirect/"):
+            return self._send(302, {"Location": "/" + self.path.split("/")[-1]})
+        if not self.path.endswith(".pkl"):
+            return self._send(404)
+        headers = {"ETag": self.etag}
+        if_range = self.headers.get("If-Range")
+        if range_header is None or self.path.startswith("/no_range/") or if_range not in (None, self.etag):
+            return self._send(200, headers, _MODEL_CONTENTS)
+        offset = int(range_header[len("bytes=") : -len("-")])
+        if offset >= len(_MODEL_CONTENTS):
+            return self._send(416)
+        if self.path.startswith("/bad_range/"):
+            offset //= 2
+        headers["Content-Range"] = f"bytes {offset}-{len(_MODEL_CONTENTS) - 1}/{len(_MODEL_CONTENTS)}"
+        return self._send(206, headers, _MODEL_CONTENTS[offset:])
+
+
+class DownloadTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _ModelServerHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _ModelServerHandler.requests.clear()
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.download_dir = self._tmp_dir.name
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _assert_downloaded(self, filepath: str, digest: str):
+        with open(filepath, "rb") as f:
+            self.assertEqual(f.read(), _MODEL_CONTENTS)
+        self.assertEqual(digest, hashlib.sha256(_MODEL_CONTENTS).hexdigest())
+        self.assertFalse(os.path.exists(filepath + ".part"))
+        self.assertFalse(os.path.exists(filepath + ".part.etag"))
+
+    def _write_part_file(self, filepath: str, contents: bytes, etag: Optional[str] = None):
+        with open(filepath + ".part", "wb") as f:
+            f.write(contents)
+        if etag is not None:
+            with open(filepath + ".part.etag", "w") as f:
+                f.write(etag)
+
+    def test_download_file(self):
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        digest = _download_file(f"{self.base_url}/model.pkl", filepath)
+        self._assert_downloaded(filepath, digest)
+        self.assertEqual(_ModelServerHandler.requests, [("/model.pkl", None)])
+
+    def test_download_file_resume(self):
+        """A partially downloaded file is resumed with a Range request"""
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        self._write_part_file(filepath, _MODEL_CONTENTS[:1234], etag=_ModelServerHandler.etag)
+        digest = _download_file(f"{self.base_url}/model.pkl", filepath)
+        self._assert_downloaded(filepath, digest)
+        self.assertEqual(_ModelServerHandler.requests, [("/model.pkl", "bytes=1234-")])
+
+    def test_download_file_remote_changed(self):
+        """The '.part' file is discarded when the remote file's ETag differs from the one the download started with"""
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        self._write_part_file(filepath, b"an older model", etag='"v0"')
+        digest = _download_file(f"{self.base_url}/model.pkl", filepath)
+        self._assert_downloaded(filepath, digest)
+        self.assertEqual(_ModelServerHandler.requests, [("/model.pkl", "bytes=14-")])
+
+    def test_download_file_range_mismatch(self):
+        """The download is restarted when the server responds with a different range than the one requested"""
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        self._write_part_file(filepath, _MODEL_CONTENTS[:1234])
+        digest = _download_file(f"{self.base_url}/bad_range/model.pkl", filepath)
+        self._assert_downloaded(filepath, digest)
+        self.assertEqual(
+            _ModelServerHandler.requests, [("/bad_range/model.pkl", "bytes=1234-"), ("/bad_range/model.pkl", None)]
+        )
+
+    def test_download_file_range_ignored(self):
+        """The '.part' file is overwritten when the server responds with the whole file"""
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        self._write_part_file(filepath, b"not the model")
+        digest = _download_file(f"{self.base_url}/no_range/model.pkl", filepath)
+        self._assert_downloaded(filepath, digest)
+        self.assertEqual(_ModelServerHandler.requests, [("/no_range/model.pkl", "bytes=13-")])
+
+    def test_download_file_range_not_satisfiable(self):
+        """A '.part' file that's larger than the remote file is discarded and the download restarted"""
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        self._write_part_file(filepath, _MODEL_CONTENTS + b"extra")
+        digest = _download_file(f"{self.base_url}/model.pkl", filepath)
+        self._assert_downloaded(filepath, digest)
+        self.assertEqual(
+            _ModelServerHandler.requests, [("/model.pkl", f"bytes={len(_MODEL_CONTENTS) + 5}-"), ("/model.pkl", None)]
+        )
+
+    def test_download_file_redirect(self):
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        digest = _download_file(f"{self.base_url}/redirect/model.pkl", filepath)
+        self._assert_downloaded(filepath, digest)
+        self.assertEqual(_ModelServerHandler.requests, [("/redirect/model.pkl", None), ("/model.pkl", None)])
+
+    def test_download_file_not_found(self):
+        filepath = os.path.join(self.download_dir, "model.txt")
+        with self.assertRaises(HTTPError) as context:
+            _download_file(f"{self.base_url}/model.txt", filepath)
+        self.assertEqual(context.exception.code, 404)
+        self.assertFalse(os.path.exists(filepath))
+
+    def test_download_file_redirect_loop(self):
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        with self.assertRaises(HTTPError) as context:
+            _download_file(f"{self.base_url}/loop", filepath)
+        self.assertEqual(context.exception.code, 302)
+        self.assertEqual(len(_ModelServerHandler.requests), 11)
+
+    def test_download_file_redirect_without_location(self):
+        filepath = os.path.join(self.download_dir, "model.pkl")
+        for path, status in [("/multiple_choices", 300), ("/not_modified", 304)]:
+            with self.subTest(path=path):
+                with self.assertRaises(HTTPError) as context:
+                    _download_file(f"{self.base_url}{path}", filepath)
+                self.assertEqual(context.exception.code, status)
+                self.assertFalse(os.path.exists(filepath))
+
+    def test_download_models_duplicate_urls(self):
+        url_a = f"{self.base_url}/model_a.pkl"
+        url_b = f"{self.base_url}/model_b.pkl"
+        filepaths = download_models([url_a] * 4 + [url_b, url_a], download_dir=self.download_dir)
+
+        filepath_a = os.path.join(self.download_dir, "model_a.pkl")
+        filepath_b = os.path.join(self.download_dir, "model_b.pkl")
+        self.assertEqual(filepaths, [filepath_a] * 4 + [filepath_b, filepath_a])
+        for filepath in [filepath_a, filepath_b]:
+            with open(filepath, "rb") as f:
+                self.assertEqual(f.read(), _MODEL_CONTENTS)
+            self.assertTrue(_checksum_matches(filepath, hashlib.sha256(_MODEL_CONTENTS).hexdigest()))
+        self.assertEqual([path for path, _ in _ModelServerHandler.requests].count("/model_a.pkl"), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import pickle
 
 import torch
 from jrl.robots import Panda
@@ -12,6 +13,21 @@ set_seed()
 
 _PANDA = Panda()
 
+# `IkflowModelParameters(nb_nodes=5)` pickled (protocol 2, as `torch.save()` uses) by the class as it was before
+# `__slots__` was added, when it lived in `ikflow.model`. Like checkpoints from older training runs, it's missing
+# 'sigmoid_on_output' and has an attribute that's no longer a model parameter ('model_weights_url')
+_LEGACY_IKFLOW_MODEL_PARAMETERS_PICKLE = (
+    b"\x80\x02cikflow.model\nIkflowModelParameters\nq\x00)\x81q\x01}q\x02(X\x0e\x00\x00\x00coupling_layerq"
+    b"\x03X\x04\x00\x00\x00glowq\x04X\x08\x00\x00\x00nb_nodesq\x05K\x05X\x10\x00\x00\x00dim_latent_spaceq"
+    b"\x06K\tX\x0f\x00\x00\x00coeff_fn_configq\x07K\x03X\x16\x00\x00\x00coeff_fn_internal_sizeq\x08M\x00"
+    b"\x04X\x16\x00\x00\x00permute_random_enabledq\t\x88X\r\x00\x00\x00lambd_predictq\nG?\xf0\x00\x00\x00"
+    b"\x00\x00\x00X\n\x00\x00\x00init_scaleq\x0bG?\xa6\xe7\x81\x9d\x06R\x0eX\n\x00\x00\x00rnvp_clampq\x0cG@"
+    b"\x04\x00\x00\x00\x00\x00\x00X\r\x00\x00\x00y_noise_scaleq\rG>z\xd7\xf2\x9a\xbc\xafHX\x11\x00\x00\x00z"
+    b"eros_noise_scaleq\x0eG?PbM\xd2\xf1\xa9\xfcX\x14\x00\x00\x00softflow_noise_scaleq\x0fG?\x84z\xe1G\xae"
+    b"\x14{X\x10\x00\x00\x00softflow_enabledq\x10\x88X\x11\x00\x00\x00model_weights_urlq\x11X\x06\x00\x00"
+    b"\x00unusedq\x12ub."
+)
+
 
 class ModelTest(unittest.TestCase):
     def setUp(self) -> None:
@@ -122,6 +138,23 @@ class ModelTest(unittest.TestCase):
         output_rev, _ = model(latent, c=conditional, rev=True)
         assert_joint_angle_tensor_in_joint_limits(_PANDA.actuated_joints_limits, output_rev, "reverse", eps=1e-5)
 
+    def test_ikflow_model_parameters_pickle(self):
+        """Test that IkflowModelParameters survives a pickle round trip, including from the pre-__slots__ state format"""
+        params = IkflowModelParameters()
+        params.nb_nodes = 3
+        params.run_description = "test"
+        unpickled = pickle.loads(pickle.dumps(params))
+        self.assertEqual(unpickled.nb_nodes, 3)
+        self.assertEqual(unpickled.run_description, "test")
+
+        # Older checkpoints store the instance __dict__, which may be missing parameters or have unused ones
+        legacy = pickle.loads(_LEGACY_IKFLOW_MODEL_PARAMETERS_PICKLE)
+        self.assertIsInstance(legacy, IkflowModelParameters)
+        self.assertEqual(legacy.nb_nodes, 5)
+        self.assertFalse(legacy.sigmoid_on_output)
+        self.assertIsNone(legacy.run_description)
+        self.assertFalse(hasattr(legacy, "model_weights_url"))
+
     def test_glow_cNF_model(self):
         """Smoke test - checks that glow_cNF_model() returns"""
 
@@ -0,0 +1,73 @@
+import unittest
+import threading
+
+import torch
+import torch.nn as nn
+
+from ikflow.utils import skip_parameter_initialization
+
+
+def _seeded_linear() -> nn.Linear:
+    torch.manual_seed(0)
+    return nn.Linear(4, 4)
+
+
+class UtilsTest(unittest.TestCase):
+    def assert_initialized(self, layer: nn.Linear):
+        reference = _seeded_linear()
+        self.assertTrue(torch.equal(layer.weight, reference.weight))
+        self.assertTrue(torch.equal(layer.bias, reference.bias))
+
+    def test_skip_parameter_initialization(self):
+        with skip_parameter_initialization():
+            torch.manual_seed(0)
+            state = torch.get_rng_state()
+            nn.Linear(4, 4)
+            # No random numbers are drawn when initialization is skipped
+            self.assertTrue(torch.equal(torch.get_rng_state(), state))
+        self.assert_initialized(_seeded_linear())
+
+    def test_skip_parameter_initialization_interleaved(self):
+        """Overlapping contexts that exit in a different order than they entered should restore initialization"""
+        first = skip_parameter_initialization()
+        second = skip_parameter_initialization()
+        first.__enter__()
+        second.__enter__()
+        first.__exit__(None, None, None)
+        # Still inside `second`, so initialization should still be skipped
+        torch.manual_seed(0)
+        state = torch.get_rng_state()
+        nn.Linear(4, 4)
+        self.assertTrue(torch.equal(torch.get_rng_state(), state))
+        second.__exit__(None, None, None)
+        self.assert_initialized(_seeded_linear())
+
+    def test_skip_parameter_initialization_other_threads(self):
+        """Layers built by a thread that isn't inside the context should be initialized"""
+        entered = threading.Event()
+        built = threading.Event()
+
+        def hold_context():
+            with skip_parameter_initialization():
+                entered.set()
+                built.wait()
+
+        thread = threading.Thread(target=hold_context)
+        thread.start()
+        entered.wait()
+        try:
+            layer = _seeded_linear()
+        finally:
+            built.set()
+            thread.join()
+        self.assert_initialized(layer)
+
+    def test_skip_parameter_initialization_restores_on_error(self):
+        with self.assertRaises(ValueError):
+            with skip_parameter_initialization():
+                raise ValueError()
+        self.assert_initialized(_seeded_linear())
+
+
+if __name__ == "__main__":
+    unittest.main()